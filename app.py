@@ -1,5 +1,5 @@
-from rs_capture_toolkit import RealSenseCaptureToolkit
+from rs_capture_toolkit import get_toolkit
 
 if __name__ == "__main__":
-    toolkit = RealSenseCaptureToolkit()
+    toolkit = get_toolkit()
     toolkit.run()
@@ -0,0 +1,4 @@
+from rs_capture_toolkit import get_toolkit
+
+# Entry point for ASGI servers, e.g. `hypercorn -c hypercorn.toml asgi:app`
+app = get_toolkit().app
@@ -1,36 +1,208 @@
-from flask import Flask, render_template, Response, request, jsonify
+from quart import Quart, render_template, Response, request, jsonify
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
 import cv2
 import numpy as np
 import pyrealsense2 as rs
+from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420, TJSAMP_444
 import datetime
-import time
+import functools
+import io
+import os
+import re
 import threading
+import asyncio
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from .Utils import *
 
 
+def _parse_thread_count(value, default=2):
+    """Parse an integer thread count, falling back to the default if it is invalid."""
+    try:
+        return int(value)
+    except ValueError:
+        print(f"Ignoring invalid OPENCV_THREADS={value!r}, using {default}")
+        return default
+
+
+def _parse_cpu_list(value):
+    """Parse a comma-separated CPU list such as "2,3", or return None to skip pinning."""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return {int(cpu) for cpu in value.split(",")}
+    except ValueError:
+        print(f"Ignoring invalid PRODUCER_CPUS={value!r}, expected CPU ids like 2,3")
+        return None
+
+
+# CPUs the frame producer thread is pinned to, an empty value disables pinning
+_PRODUCER_CPUS = _parse_cpu_list(os.environ.get("PRODUCER_CPUS", "2,3"))
+
+# Keep OpenCV's worker pool small so colorizing doesn't oversubscribe the CPU
+# alongside the RealSense SDK's own threads
+cv2.setNumThreads(_parse_thread_count(os.environ.get("OPENCV_THREADS", "2")))
+cv2.setUseOptimized(True)
+
+
+def _pin_current_thread(cpus):
+    """Pin the calling thread to the given CPUs, where the platform supports it."""
+    if not cpus or not hasattr(os, "sched_setaffinity"):
+        return
+
+    # Ignore CPUs this process is not allowed to run on
+    cpus = set(cpus) & os.sched_getaffinity(0)
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError as e:
+            print(f"Error pinning thread to CPUs {sorted(cpus)}: {e}")
+
+
+def _as_array(frame, shape, dtype):
+    """View a RealSense frame's buffer as an ndarray without copying it.
+
+    The array aliases the frame's memory, so keep the frame alive while it is used.
+    """
+    return np.frombuffer(frame.get_data(), dtype=dtype).reshape(shape)
+
+
+async def _request_json():
+    """Return the request's JSON object, or an empty dict if it is missing or invalid."""
+    data = await request.get_json(silent=True, cache=True)
+    return data if isinstance(data, dict) else {}
+
+
+def _write_file(file_path, data):
+    """Write encoded image bytes to disk, reporting instead of raising on failure."""
+    try:
+        file_path.write_bytes(data)
+    except OSError as e:
+        print(f"Error writing {file_path}: {e}")
+
+
+def _create_nvjpeg_encoder():
+    """Create an nvJPEG encoder, or return None if no CUDA device is usable."""
+    try:
+        from nvjpeg import NvJpeg
+
+        return NvJpeg()
+    except Exception as e:
+        print(f"nvJPEG is not available, falling back to libjpeg-turbo: {e}")
+        return None
+
+
 class RealSenseCaptureToolkit:
+    # multipart/x-mixed-replace framing around each JPEG in the video feed
+    _HDR = b"--frame\r\nContent-Type: image/jpeg\r\n\r\n"
+    _FTR = b"\r\n\r\n"
+
     def __init__(self):
-        self.app = Flask("RealSense Capture Toolkit")
+        self.app = Quart("RealSense Capture Toolkit")
+
+        # Separate libjpeg-turbo encoders: the live preview trades quality and
+        # chroma for speed, captures keep full chroma at high quality
+        self._tj_stream = TurboJPEG()
+        self._tj_capture = TurboJPEG()
+
         self.pipeline = None
         self.align = None
+        self.latest_frameset = None
         self.streaming = False
         self.stream_lock = threading.Lock()
 
+        # Serializes captures, they share the align block and its output queue
+        self._capture_lock = threading.Lock()
+
+        # Most recently encoded frame, shared by every viewer. The sequence
+        # number lets each viewer wait for a frame it has not sent yet.
+        # asyncio primitives bind to the serving loop on first use (Python 3.10+),
+        # so they can be created here before that loop exists.
+        self._frame_seq = 0
+        self._frame_bytes = b""
+        self._frame_cv = asyncio.Condition()
+        self._producer_thread = None
+
+        # Set while streaming so idle viewers wake up as soon as a stream starts
+        self._stream_started = asyncio.Event()
+
+        # Captures are encoded in memory and written to disk in the background
+        self._io_pool = ThreadPoolExecutor(max_workers=2)
+
         # Load RealSense settings from JSON file
         self.rs_config = read_config()
 
+        # Captured depth is saved as 16-bit PNG, raw .npy or zstd-compressed .npy,
+        # configs written before depth_format existed keep the PNG output
+        self._depth_format = getattr(self.rs_config, "depth_format", "png")
+        if self._depth_format not in ("png", "npy", "zstd"):
+            raise ValueError(
+                f"Unsupported depth_format: {self._depth_format!r}, "
+                "expected 'png', 'npy' or 'zstd'"
+            )
+
+        # Import zstandard up front so a missing extra fails at startup
+        self._zstd = None
+        if self._depth_format == "zstd":
+            import zstandard
+
+            self._zstd = zstandard
+
         # Create a black image for fallback use when frames are not available
         self.black_image = np.zeros(
             (self.rs_config.image_height, self.rs_config.image_width * 2, 3),
             dtype=np.uint8,
         )
 
+        # The fallback frame never changes, so encode it once
+        self._fallback_bytes = b"".join(
+            (
+                self._HDR,
+                self._tj_stream.encode(
+                    self.black_image,
+                    quality=75,
+                    pixel_format=TJPF_BGR,
+                    jpeg_subsample=TJSAMP_420,
+                ),
+                self._FTR,
+            )
+        )
+
+        # Pre-allocate the producer's working buffers, they are fully
+        # overwritten on every frame
+        height, width = self.rs_config.image_height, self.rs_config.image_width
+        self._combined = np.empty((height, width * 2, 3), dtype=np.uint8)
+        self._depth_scaled = np.empty((height, width), dtype=np.uint8)
+
+        # Build the JET colormap table once instead of on every applyColorMap call
+        self._depth_lut = cv2.applyColorMap(
+            np.arange(256, dtype=np.uint8).reshape(-1, 1), cv2.COLORMAP_JET
+        )
+
+        # Reusable output buffer that libjpeg-turbo encodes the combined image into
+        self._jpeg_buf = bytearray(
+            self._tj_stream.buffer_size(self._combined, TJSAMP_420)
+        )
+        self._jpeg_mv = memoryview(self._jpeg_buf)
+
+        # Optionally encode the preview on the GPU, libjpeg-turbo is the default
+        jpeg_backend = getattr(self.rs_config, "jpeg_backend", "turbojpeg")
+        if jpeg_backend not in ("turbojpeg", "nvjpeg"):
+            raise ValueError(
+                f"Unsupported jpeg_backend: {jpeg_backend!r}, "
+                "expected 'turbojpeg' or 'nvjpeg'"
+            )
+        self._nvjpeg = None
+        if jpeg_backend == "nvjpeg":
+            self._nvjpeg = _create_nvjpeg_encoder()
+
         # Define routes
         self._define_routes()
 
     def _define_routes(self):
-        """Define Flask routes for the web interface."""
+        """Define Quart routes for the web interface."""
         self.app.add_url_rule("/devices", "list_devices", self.list_devices)
         self.app.add_url_rule(
             "/start_stream", "start_stream", self.start_stream, methods=["POST"]
@@ -55,21 +227,37 @@ class RealSenseCaptureToolkit:
         ]
         return devices
 
-    def list_devices(self):
+    async def list_devices(self):
         """List all connected RealSense devices."""
-        devices = self.get_connected_devices()
+        devices = await asyncio.to_thread(self.get_connected_devices)
         return jsonify(devices)
 
-    def start_stream(self):
+    async def start_stream(self):
         """Start the RealSense stream based on the device serial number provided."""
+        device_serial = (await _request_json()).get("serial")
+        if not device_serial:
+            return "Device serial number is required", 400
+
+        # Reject junk before it reaches pyrealsense2
+        if not isinstance(device_serial, str) or not re.fullmatch(
+            r"[0-9A-Za-z]{6,16}", device_serial
+        ):
+            return "Invalid device serial number", 400
+
+        loop = asyncio.get_running_loop()
+
+        # Starting the pipeline blocks on USB negotiation, keep it off the loop
+        response = await asyncio.to_thread(self._start_stream, device_serial, loop)
+        if self.streaming:
+            self._stream_started.set()
+        return response
+
+    def _start_stream(self, device_serial, loop):
+        """Start the pipeline and the frame producer thread for the given device."""
         with self.stream_lock:
             if self.streaming:
                 return "", 204  # Already streaming
 
-            device_serial = request.json.get("serial")
-            if not device_serial:
-                return "Device serial number is required", 400
-
             self.pipeline = rs.pipeline()
             config = rs.config()
             config.enable_device(device_serial)
@@ -87,21 +275,43 @@ class RealSenseCaptureToolkit:
                 rs.format.z16,
                 self.rs_config.fps,
             )
+
+            # Deliver framesets into a single-slot queue so the preview and
+            # /capture always read the newest frame instead of queueing behind
+            # each other on wait_for_frames. The bound enqueue is passed
+            # directly so the SDK callback thread skips a Python closure
+            latest_frameset = rs.frame_queue(1)
             try:
-                self.pipeline.start(config)
+                self.pipeline.start(config, latest_frameset.enqueue)
             except Exception as e:
                 self.pipeline = None
                 return f"Failed to start stream: {e}", 500
 
+            self.latest_frameset = latest_frameset
             align_to = rs.stream.color
             self.align = rs.align(align_to)
             self.streaming = True
 
+            self._producer_thread = threading.Thread(
+                target=self._producer,
+                args=(self.pipeline, latest_frameset, loop),
+                daemon=True,
+            )
+            self._producer_thread.start()
+
         return "", 204
 
-    def stop_stream(self):
+    async def stop_stream(self):
         """Stop the RealSense stream."""
+        await asyncio.to_thread(self._stop_stream)
+        self._stream_started.clear()
+        return "", 204
+
+    def _stop_stream(self):
+        """Stop the pipeline and wait for the frame producer thread to exit."""
         with self.stream_lock:
+            self.streaming = False
+
             if self.pipeline is not None:
                 try:
                     self.pipeline.stop()
@@ -109,114 +319,243 @@ class RealSenseCaptureToolkit:
                     print(f"Error stopping pipeline: {e}")
                 finally:
                     self.pipeline = None
+                    self.latest_frameset = None
 
-            self.streaming = False
-        return "", 204
+            # The producer exits on its next frame timeout once the pipeline is gone
+            if self._producer_thread is not None:
+                self._producer_thread.join(timeout=1.0)
+                self._producer_thread = None
 
-    def capture(self):
+    async def capture(self):
         """Capture and save color and depth images."""
+        folder_name = (await _request_json()).get("folder_name", "default")
+
+        # The folder must be a single path component so captures stay in captures/
+        if (
+            not isinstance(folder_name, str)
+            or folder_name in ("", ".", "..")
+            or re.search(r"[/\\\x00]", folder_name)
+        ):
+            return "Invalid folder name", 400
+
         if not self.streaming or self.pipeline is None:
             return "Streaming is not active", 400
 
-        data = request.json
-        folder_name = data.get("folder_name", "default")
+        timestamp = await asyncio.to_thread(self._capture, folder_name)
+        if timestamp is None:
+            return "Failed to capture frames", 500
 
-        with self.stream_lock:
-            frames = self.pipeline.wait_for_frames()
-            aligned_frames = self.align.process(frames)
+        return jsonify({"timestamp": timestamp}), 200
 
-            aligned_depth_frame = aligned_frames.get_depth_frame()
-            color_frame = aligned_frames.get_color_frame()
+    def _capture(self, folder_name):
+        """Grab and align the newest frameset and queue its images for writing."""
+        with self._capture_lock:
+            return self._capture_locked(folder_name)
 
-            if not aligned_depth_frame or not color_frame:
-                return "Failed to capture frames", 500
+    def _capture_locked(self, folder_name):
+        """Capture body, called with the capture lock held."""
+        latest_frameset, align = self.latest_frameset, self.align
+        if latest_frameset is None:
+            return None
 
-            color_image = np.asanyarray(color_frame.get_data())
-            depth_image = np.asanyarray(aligned_depth_frame.get_data())
+        # Take the frameset already waiting in the queue, if any, and only
+        # block for the next one when the queue is empty
+        frame = latest_frameset.poll_for_frame()
+        try:
+            if not frame:
+                frame = latest_frameset.wait_for_frame(timeout_ms=500)
+            aligned_frames = align.process(frame.as_frameset())
+        except RuntimeError as e:
+            print(f"Runtime error during frame capture: {e}")
+            return None
+
+        aligned_depth_frame = aligned_frames.get_depth_frame()
+        color_frame = aligned_frames.get_color_frame()
+
+        if not aligned_depth_frame or not color_frame:
+            return None
+
+        height, width = self.rs_config.image_height, self.rs_config.image_width
+        color_image = _as_array(color_frame, (height, width, 3), np.uint8)
+        depth_image = _as_array(aligned_depth_frame, (height, width), np.uint16)
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        save_path = PROJ_ROOT / "captures" / folder_name
+        save_path.mkdir(parents=True, exist_ok=True)
+
+        depth_suffix, depth_data = self._encode_depth(depth_image)
+        color_filename = save_path / f"color_{timestamp}.jpg"
+        depth_filename = save_path / f"depth_{timestamp}{depth_suffix}"
+
+        color_jpeg = self._tj_capture.encode(
+            color_image,
+            quality=92,
+            pixel_format=TJPF_BGR,
+            jpeg_subsample=TJSAMP_444,
+        )
 
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            save_path = PROJ_ROOT / "captures" / folder_name
-            save_path.mkdir(parents=True, exist_ok=True)
+        self._io_pool.submit(_write_file, color_filename, color_jpeg)
+        self._io_pool.submit(_write_file, depth_filename, depth_data)
 
-            color_filename = save_path / f"color_{timestamp}.jpg"
-            depth_filename = save_path / f"depth_{timestamp}.png"
+        return timestamp
 
-            cv2.imwrite(str(color_filename), color_image)
-            cv2.imwrite(str(depth_filename), depth_image)
+    def _encode_depth(self, depth_image):
+        """Serialize a z16 depth image in the configured format.
 
-        return jsonify({"timestamp": timestamp}), 200
+        Returns the file suffix and a bytes-like object that no longer aliases
+        the frame's memory, so it can be written after the frame is released.
+        """
+        if self._depth_format == "png":
+            return ".png", cv2.imencode(".png", depth_image)[1]
 
-    def get_frames(self):
-        """Generator function to retrieve and yield frames for streaming."""
-        while True:
-            with self.stream_lock:
-                if self.streaming and self.pipeline is not None:
-                    try:
-                        frames = self.pipeline.wait_for_frames()
-                        aligned_frames = self.align.process(frames)
+        # The .npy header keeps shape and dtype, skipping PNG's DEFLATE entirely
+        npy = io.BytesIO()
+        np.save(npy, depth_image, allow_pickle=False)
+        if self._zstd is not None:
+            # Compressors are not thread-safe and cheap to create, so use one per call
+            compressor = self._zstd.ZstdCompressor(level=1, threads=-1)
+            return ".npy.zst", compressor.compress(npy.getbuffer())
+        return ".npy", npy.getbuffer()
+
+    def _producer(self, pipeline, latest_frameset, loop):
+        """Acquire, colorize and encode frames into the latest-frame queue."""
+        _pin_current_thread(_PRODUCER_CPUS)
 
-                        aligned_depth_frame = aligned_frames.get_depth_frame()
-                        color_frame = aligned_frames.get_color_frame()
+        height, width = self.rs_config.image_height, self.rs_config.image_width
 
-                        if not aligned_depth_frame or not color_frame:
-                            continue
+        # Resolve everything that stays fixed for the lifetime of the stream once,
+        # rather than on every frame
+        color_shape, depth_shape = (height, width, 3), (height, width)
+        color_half, depth_half = self._combined[:, :width], self._combined[:, width:]
+        depth_scaled, depth_lut = self._depth_scaled, self._depth_lut
+        wait_for_frame = latest_frameset.wait_for_frame
 
-                        color_image = np.asanyarray(color_frame.get_data())
-                        depth_image = np.asanyarray(aligned_depth_frame.get_data())
+        # Exit as soon as this pipeline is stopped or replaced by a new stream
+        while self.streaming and pipeline is self.pipeline:
+            try:
+                frames = wait_for_frame(timeout_ms=500).as_frameset()
 
-                        # Normalize depth image for visualization
-                        depth_colormap = cv2.applyColorMap(
-                            cv2.convertScaleAbs(depth_image, alpha=0.03),
-                            cv2.COLORMAP_JET,
-                        )
+                # The side-by-side preview does not need depth reprojected onto
+                # the color viewpoint, only /capture aligns the frames
+                depth_frame = frames.get_depth_frame()
+                color_frame = frames.get_color_frame()
 
-                        # Combine the color and depth images side by side
-                        combined_image = np.hstack((color_image, depth_colormap))
+                if not depth_frame or not color_frame:
+                    continue
 
-                        # Encode the combined image
-                        combined_jpeg = cv2.imencode(".jpg", combined_image)[1]
+                color_image = _as_array(color_frame, color_shape, np.uint8)
+                depth_image = _as_array(depth_frame, depth_shape, np.uint16)
 
-                        yield (
-                            b"--frame\r\n"
-                            b"Content-Type: image/jpeg\r\n\r\n"
-                            + combined_jpeg.tobytes()
-                            + b"\r\n\r\n"
-                        )
+                # Combine the color and depth images side by side, writing both
+                # halves straight into the pre-allocated buffer
+                color_half[:] = color_image
 
-                    except RuntimeError as e:
-                        print(f"Runtime error during frame retrieval: {e}")
-                        yield from self.yield_fallback_image()
+                # Normalize depth image for visualization
+                cv2.convertScaleAbs(depth_image, dst=depth_scaled, alpha=0.03)
+                cv2.applyColorMap(depth_scaled, depth_lut, dst=depth_half)
 
-                    except Exception as e:
-                        print(f"Unexpected error during frame retrieval: {e}")
-                        yield from self.yield_fallback_image()
-                else:
-                    yield from self.yield_fallback_image()
+                # Frame the JPEG for the multipart stream with a single copy
+                frame_bytes = b"".join(
+                    (
+                        self._HDR,
+                        self._encode_combined(),
+                        self._FTR,
+                    )
+                )
 
-            time.sleep(0.1)  # Add a slight delay to avoid hammering the CPU
+            except RuntimeError as e:
+                if pipeline is self.pipeline:
+                    print(f"Runtime error during frame retrieval: {e}")
+                continue
 
-    def yield_fallback_image(self):
-        """Yield a black fallback image when no frames are available."""
-        fallback_image = cv2.imencode(".jpg", self.black_image)[1]
-        yield (
-            b"--frame\r\n"
-            b"Content-Type: image/jpeg\r\n\r\n" + fallback_image.tobytes() + b"\r\n\r\n"
+            except Exception as e:
+                print(f"Unexpected error during frame retrieval: {e}")
+                continue
+
+            # The condition belongs to the event loop, publish the frame there
+            asyncio.run_coroutine_threadsafe(self._publish_frame(frame_bytes), loop)
+
+    def _encode_combined(self):
+        """Encode the combined image and return the JPEG as a bytes-like object."""
+        if self._nvjpeg is not None:
+            return self._nvjpeg.encode(self._combined, 75)
+
+        # Encode into the reusable buffer and return a view of the used part
+        _, jpeg_size = self._tj_stream.encode(
+            self._combined,
+            quality=75,
+            pixel_format=TJPF_BGR,
+            jpeg_subsample=TJSAMP_420,
+            dst=self._jpeg_buf,
         )
+        return self._jpeg_mv[:jpeg_size]
+
+    async def _publish_frame(self, frame_bytes):
+        """Publish a newly encoded frame and wake every waiting viewer."""
+        async with self._frame_cv:
+            self._frame_seq += 1
+            self._frame_bytes = frame_bytes
+            self._frame_cv.notify_all()
+
+    async def get_frames(self):
+        """Async generator to retrieve and yield frames for streaming."""
+        # Start from the next published frame, never a stale one from an old stream
+        last_seq = self._frame_seq
+        while True:
+            if not self.streaming:
+                async for fallback in self.yield_fallback_image():
+                    yield fallback
+                # The fallback image is static, so refresh it rarely but switch
+                # to the live stream as soon as it starts
+                try:
+                    await asyncio.wait_for(self._stream_started.wait(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                async with self._frame_cv:
+                    await asyncio.wait_for(
+                        self._frame_cv.wait_for(lambda: self._frame_seq != last_seq),
+                        timeout=1.0,
+                    )
+                    last_seq, frame_bytes = self._frame_seq, self._frame_bytes
+            except asyncio.TimeoutError:
+                async for fallback in self.yield_fallback_image():
+                    yield fallback
+                continue
+
+            yield frame_bytes
+
+    async def yield_fallback_image(self):
+        """Yield a black fallback image when no frames are available."""
+        yield self._fallback_bytes
 
-    def video_feed(self):
+    async def video_feed(self):
         """Provide the video feed to the front-end."""
-        return Response(
+        response = Response(
             self.get_frames(), mimetype="multipart/x-mixed-replace; boundary=frame"
         )
+        # The feed is loaded once per page and streams indefinitely, so exempt
+        # it from Quart's RESPONSE_TIMEOUT
+        response.timeout = None
+        return response
 
-    def index(self):
+    async def index(self):
         """Render the main index page."""
-        return render_template("index.html")
+        return await render_template("index.html")
 
     def run(self):
-        """Run the Flask web server."""
+        """Run the Quart app on the Hypercorn ASGI server."""
         try:
-            self.app.run(host="0.0.0.0", port=5000)
+            config = Config.from_toml(PROJ_ROOT / "hypercorn.toml")
+            asyncio.run(serve(self.app, config))
         except Exception as e:
-            print(f"Error running the Flask app: {e}")
+            print(f"Error running the Quart app: {e}")
             sys.exit(1)
+
+
+@functools.cache
+def get_toolkit():
+    """Return the process-wide toolkit, creating it on first use."""
+    return RealSenseCaptureToolkit()
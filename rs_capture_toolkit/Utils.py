@@ -1,15 +1,31 @@
+import json
 import logging
+import functools
 from pathlib import Path
-import json
-from easydict import EasyDict
+from types import SimpleNamespace
+import orjson
 
 
 PROJ_ROOT = Path(__file__).resolve().parents[1]
+_CONFIG_FILE = PROJ_ROOT / "config" / "config.json"
+
+# Shared by every handler created in get_logger
+_FORMATTER = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
 
+# The config is parsed once per process, call read_config.cache_clear() to reload it
+@functools.lru_cache(maxsize=1)
 def read_config():
-    config_file = PROJ_ROOT / "config" / "config.json"
-    config = read_data_from_json(config_file)
-    return EasyDict(config)
+    config = read_data_from_json(_CONFIG_FILE)
+    return _to_namespace(config)
+
+
+def _to_namespace(obj):
+    """Recursively convert dicts to SimpleNamespace for plain attribute access."""
+    if isinstance(obj, dict):
+        return SimpleNamespace(**{k: _to_namespace(v) for k, v in obj.items()})
+    if isinstance(obj, list):
+        return [_to_namespace(v) for v in obj]
+    return obj
 
 
 def get_logger(name, level="INFO"):
@@ -31,26 +47,55 @@ def get_logger(name, level="INFO"):
     logger.setLevel(log_level)
 
     # Avoid adding multiple handlers if the logger already has them
-    if not logger.handlers:
-        formatter = logging.Formatter(
-            "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-        )
+    if logger.handlers:
+        return logger
 
-        ch = logging.StreamHandler()
-        ch.setLevel(log_level)  # Set the handler's level as well
-        ch.setFormatter(formatter)
+    ch = logging.StreamHandler()
+    ch.setLevel(log_level)  # Set the handler's level as well
+    ch.setFormatter(_FORMATTER)
 
-        logger.addHandler(ch)
+    logger.addHandler(ch)
+
+    # The handler above already emits the record, don't repeat it via the root logger
+    logger.propagate = False
 
     return logger
 
 
 def read_data_from_json(file_path):
-    with Path(file_path).open("r") as f:
-        data = json.load(f)
-    return data
+    data = Path(file_path).read_bytes()
+    try:
+        return orjson.loads(data)
+    except orjson.JSONDecodeError:
+        # Files written by json.dump may hold NaN/Infinity, which orjson rejects
+        return json.loads(data)
+
+
+def read_data_from_json_cached(file_path):
+    """
+    Reads a JSON file once and returns the same parsed object on later calls.
+
+    The result is shared between callers, so treat it as read-only.
+
+    Args:
+        file_path (str or Path): Path to the JSON file.
+
+    Returns:
+        The parsed JSON data.
+    """
+    return _read_data_from_json_cached(str(Path(file_path).resolve()))
+
+
+@functools.lru_cache(maxsize=32)
+def _read_data_from_json_cached(resolved_path):
+    return read_data_from_json(resolved_path)
 
 
 def write_data_to_json(file_path, data):
-    with Path(file_path).open("w") as f:
-        json.dump(data, f, indent=2, sort_keys=False, ensure_ascii=True)
+    # OPT_NON_STR_KEYS stringifies int/float/bool/None keys like json.dump did,
+    # OPT_SERIALIZE_NUMPY accepts numpy scalars and arrays. NaN and Infinity
+    # are written as null.
+    option = (
+        orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+    Path(file_path).write_bytes(orjson.dumps(data, option=option))
@@ -1,2 +1,2 @@
 from .Utils import *
-from .RealSenseCaptureToolkit import RealSenseCaptureToolkit
\ No newline at end of file
+from .RealSenseCaptureToolkit import RealSenseCaptureToolkit, get_toolkit
\ No newline at end of file
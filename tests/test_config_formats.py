@@ -0,0 +1,66 @@
+import importlib
+import io
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+toolkit_module = importlib.import_module("rs_capture_toolkit.RealSenseCaptureToolkit")
+
+
+def make_toolkit(monkeypatch, **options):
+    config = SimpleNamespace(image_width=64, image_height=48, fps=30, **options)
+    monkeypatch.setattr(toolkit_module, "read_config", lambda: config)
+    return toolkit_module.RealSenseCaptureToolkit()
+
+
+@pytest.fixture
+def depth_image():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 65536, size=(48, 64), dtype=np.uint16)
+
+
+def test_jpeg_backend_defaults_to_turbojpeg(monkeypatch):
+    assert make_toolkit(monkeypatch)._nvjpeg is None
+
+
+def test_unknown_jpeg_backend_is_rejected(monkeypatch):
+    with pytest.raises(ValueError, match="jpeg_backend"):
+        make_toolkit(monkeypatch, jpeg_backend="nvJPEG")
+
+
+def test_depth_format_defaults_to_png(monkeypatch):
+    assert make_toolkit(monkeypatch)._depth_format == "png"
+
+
+def test_unknown_depth_format_is_rejected(monkeypatch):
+    with pytest.raises(ValueError, match="depth_format"):
+        make_toolkit(monkeypatch, depth_format="tiff")
+
+
+def test_encode_depth_png_round_trip(monkeypatch, depth_image):
+    suffix, data = make_toolkit(monkeypatch, depth_format="png")._encode_depth(
+        depth_image
+    )
+    assert suffix == ".png"
+    decoded = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_UNCHANGED)
+    np.testing.assert_array_equal(decoded, depth_image)
+
+
+def test_encode_depth_npy_round_trip(monkeypatch, depth_image):
+    suffix, data = make_toolkit(monkeypatch, depth_format="npy")._encode_depth(
+        depth_image
+    )
+    assert suffix == ".npy"
+    np.testing.assert_array_equal(np.load(io.BytesIO(data)), depth_image)
+
+
+def test_encode_depth_zstd_round_trip(monkeypatch, depth_image):
+    zstandard = pytest.importorskip("zstandard")
+    suffix, data = make_toolkit(monkeypatch, depth_format="zstd")._encode_depth(
+        depth_image
+    )
+    assert suffix == ".npy.zst"
+    raw = zstandard.ZstdDecompressor().decompress(data)
+    np.testing.assert_array_equal(np.load(io.BytesIO(raw)), depth_image)
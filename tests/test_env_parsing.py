@@ -0,0 +1,30 @@
+import pytest
+
+from rs_capture_toolkit.RealSenseCaptureToolkit import (
+    _parse_cpu_list,
+    _parse_thread_count,
+)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [("2,3", {2, 3}), ("0", {0}), (" 1, 4 ", {1, 4}), ("3,3", {3})],
+)
+def test_parse_cpu_list(value, expected):
+    assert _parse_cpu_list(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "  ", "2-3", "a,b", "2,,3"])
+def test_parse_cpu_list_disables_pinning(value):
+    assert _parse_cpu_list(value) is None
+
+
+@pytest.mark.parametrize("value, expected", [("2", 2), ("8", 8), ("0", 0), (" 4 ", 4)])
+def test_parse_thread_count(value, expected):
+    assert _parse_thread_count(value) == expected
+
+
+@pytest.mark.parametrize("value", ["", "two", "1.5"])
+def test_parse_thread_count_falls_back_to_default(value):
+    assert _parse_thread_count(value) == 2
+    assert _parse_thread_count(value, default=4) == 4
@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from rs_capture_toolkit import RealSenseCaptureToolkit
+
+
+@pytest.fixture(scope="module")
+def client():
+    return RealSenseCaptureToolkit().app.test_client()
+
+
+def post(client, path, **kwargs):
+    async def _post():
+        response = await client.post(path, **kwargs)
+        return response.status_code, await response.get_data(as_text=True)
+
+    return asyncio.run(_post())
+
+
+@pytest.mark.parametrize("body", [[], ["123456789012"], "123456789012", 1, None])
+def test_start_stream_rejects_non_object_body(client, body):
+    status, text = post(client, "/start_stream", json=body)
+    assert status == 400
+    assert text == "Device serial number is required"
+
+
+def test_start_stream_rejects_malformed_json(client):
+    status, _ = post(
+        client,
+        "/start_stream",
+        data="{not json",
+        headers={"Content-Type": "application/json"},
+    )
+    assert status == 400
+
+
+@pytest.mark.parametrize(
+    "serial",
+    ["12345", "12345678901234567", "1234-5678", "123456 ", "../etc", 123456789012],
+)
+def test_start_stream_rejects_invalid_serial(client, serial):
+    status, text = post(client, "/start_stream", json={"serial": serial})
+    assert status == 400
+    assert text == "Invalid device serial number"
+
+
+
+@pytest.mark.parametrize(
+    "folder_name",
+    [None, 1, ["a"], "", ".", "..", "../x", "a/b", "/tmp/x", "a\\b", "a\x00b"],
+)
+def test_capture_rejects_invalid_folder_name(client, folder_name):
+    status, text = post(client, "/capture", json={"folder_name": folder_name})
+    assert status == 400
+    assert text == "Invalid folder name"
+
+
+@pytest.mark.parametrize("body", [{}, {"folder_name": "session_01"}, []])
+def test_capture_accepts_valid_folder_name(client, body):
+    status, text = post(client, "/capture", json=body)
+    assert status == 400
+    assert text == "Streaming is not active"
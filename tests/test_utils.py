@@ -0,0 +1,42 @@
+import json
+import math
+
+import numpy as np
+
+from rs_capture_toolkit.Utils import read_data_from_json, write_data_to_json
+
+
+def test_write_stringifies_non_str_keys(tmp_path):
+    file_path = tmp_path / "data.json"
+    data = {1: "a", 2.5: "b", None: "c", "d": "e"}
+    write_data_to_json(file_path, data)
+    assert read_data_from_json(file_path) == json.loads(json.dumps(data))
+
+
+def test_write_accepts_numpy_values(tmp_path):
+    file_path = tmp_path / "data.json"
+    data = {
+        "float": np.float64(0.5),
+        "int": np.int64(3),
+        "array": np.array([[1.0, 2.0], [3.0, 4.0]], dtype=np.float32),
+    }
+    write_data_to_json(file_path, data)
+    assert read_data_from_json(file_path) == {
+        "float": 0.5,
+        "int": 3,
+        "array": [[1.0, 2.0], [3.0, 4.0]],
+    }
+
+
+def test_write_nan_as_null(tmp_path):
+    file_path = tmp_path / "data.json"
+    write_data_to_json(file_path, {"nan": math.nan, "inf": math.inf})
+    assert read_data_from_json(file_path) == {"nan": None, "inf": None}
+
+
+def test_read_legacy_nan_and_infinity(tmp_path):
+    file_path = tmp_path / "legacy.json"
+    file_path.write_text(json.dumps({"nan": math.nan, "inf": -math.inf}, indent=2))
+    data = read_data_from_json(file_path)
+    assert math.isnan(data["nan"])
+    assert data["inf"] == -math.inf